@@ -19,6 +19,13 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # zuliprc file
 ZULIPRC = os.path.abspath(os.path.join(os.path.dirname( __file__ ), '../../etc/', 'zuliprc'))
 
+# Sharded scheduler workers. When enabled, the web process only stores jobs
+# and reminders are fired by `manage.py run_scheduler_worker` processes.
+SCHEDULER_SHARDED = os.environ.get('REMINDMOI_SCHEDULER_SHARDED') == '1'
+SCHEDULER_HEARTBEAT_SECONDS = 10
+SCHEDULER_WORKER_TIMEOUT_SECONDS = 30
+SCHEDULER_CLAIM_RETENTION_DAYS = 7
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
@@ -121,6 +128,20 @@ USE_L10N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# Caches the `list` responses. Use a shared backend (e.g. Redis) with sharded
+# scheduler workers, so invalidations done when firing reach the web process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+LIST_CACHE_TIMEOUT_SECONDS = 24 * 60 * 60
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
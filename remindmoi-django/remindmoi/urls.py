@@ -20,7 +20,8 @@ from remindmoi_bot.views import (add_reminder,
                                  remove_reminder,
                                  list_reminders,
                                  repeat_reminder,
-                                 multi_remind)
+                                 multi_remind,
+                                 list_cache_stats)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,4 +30,5 @@ urlpatterns = [
     path('list_reminders', list_reminders),
     path('repeat_reminder', repeat_reminder),
     path('multi_remind', multi_remind),
+    path('list_cache_stats', list_cache_stats),
 ]
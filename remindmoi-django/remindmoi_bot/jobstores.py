@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, JobLookupError, ConflictingIdError
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import datetime_to_utc_timestamp
+from django.db import IntegrityError, transaction
+
+from remindmoi_bot.models import ReminderJob
+
+# The only job this bot ever schedules
+REMINDER_FUNC_REF = 'remindmoi_bot.zulip_utils:send_private_zulip_reminder'
+
+# Columns a job is rebuilt from, loaded as tuples to skip model instantiation
+JOB_COLUMNS = ('job_id', 'reminder_id', 'trigger_type', 'start_date', 'interval', 'next_run_time')
+
+
+class ReminderJobStore(BaseJobStore):
+    """
+    Stores reminder jobs as typed columns (reminder id, trigger, next run time)
+    instead of pickled APScheduler jobs. Only jobs calling
+    send_private_zulip_reminder with date or interval triggers are supported.
+    misfire_grace_time, coalesce and max_instances aren't stored, jobs always
+    use the job_defaults of the scheduler loading them.
+    """
+
+    def lookup_job(self, job_id: str) -> Optional[Job]:
+        rows = ReminderJob.objects.filter(job_id=job_id).values_list(*JOB_COLUMNS)
+        return self._reconstitute_job(*rows[0]) if rows else None
+
+    def get_due_jobs(self, now) -> List[Job]:
+        return self._get_jobs(next_run_time__lte=datetime_to_utc_timestamp(now))
+
+    def get_next_run_time(self):
+        next_run_time = ReminderJob.objects.filter(
+            next_run_time__isnull=False).order_by('next_run_time').values_list('next_run_time', flat=True).first()
+        if next_run_time is None:
+            return None
+        return datetime.fromtimestamp(next_run_time, self._scheduler.timezone)
+
+    def get_all_jobs(self) -> List[Job]:
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job: Job) -> None:
+        try:
+            with transaction.atomic():
+                ReminderJob.objects.create(job_id=job.id, **self._job_fields(job))
+        except IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job: Job) -> None:
+        updated = ReminderJob.objects.filter(job_id=job.id).update(**self._job_fields(job))
+        if not updated:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id: str) -> None:
+        deleted, _ = ReminderJob.objects.filter(job_id=job_id).delete()
+        if not deleted:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self) -> None:
+        ReminderJob.objects.all().delete()
+
+    def _get_jobs(self, **filters) -> List[Job]:
+        return [self._reconstitute_job(*row) for row in self._get_rows(**filters)]
+
+    def _get_rows(self, **filters):
+        return ReminderJob.objects.filter(**filters).order_by('next_run_time').values_list(*JOB_COLUMNS)
+
+    def _job_fields(self, job: Job) -> Dict[str, Any]:
+        if job.func_ref != REMINDER_FUNC_REF:
+            raise ValueError(f"{self.__class__.__name__} can only store {REMINDER_FUNC_REF} jobs")
+        for option, default in self._scheduler._job_defaults.items():
+            if getattr(job, option) != default:
+                raise ValueError(f"{self.__class__.__name__} can't store job {job.id} "
+                                 f"with {option}={getattr(job, option)!r}, only the scheduler default")
+        if isinstance(job.trigger, DateTrigger):
+            return {'reminder_id': job.args[0],
+                    'trigger_type': ReminderJob.DATE,
+                    'start_date': datetime_to_utc_timestamp(job.trigger.run_date),
+                    'interval': None,
+                    'next_run_time': datetime_to_utc_timestamp(job.next_run_time)}
+        if isinstance(job.trigger, IntervalTrigger):
+            return {'reminder_id': job.args[0],
+                    'trigger_type': ReminderJob.INTERVAL,
+                    'start_date': datetime_to_utc_timestamp(job.trigger.start_date),
+                    'interval': job.trigger.interval_length,
+                    'next_run_time': datetime_to_utc_timestamp(job.next_run_time)}
+        raise ValueError(f"Unsupported trigger for reminder job {job.id}: {job.trigger}")
+
+    def _reconstitute_job(self, job_id, reminder_id, trigger_type, start_date, interval, next_run_time) -> Job:
+        # Triggers are restored from their state like unpickling would, the
+        # constructors only add argument conversions the columns don't need
+        timezone = self._scheduler.timezone
+        start_date = datetime.fromtimestamp(start_date, timezone)
+        if trigger_type == ReminderJob.INTERVAL:
+            trigger = IntervalTrigger.__new__(IntervalTrigger)
+            trigger.__setstate__({'version': 2,
+                                  'timezone': timezone,
+                                  'start_date': start_date,
+                                  'end_date': None,
+                                  'interval': timedelta(seconds=interval),
+                                  'jitter': None})
+        else:
+            trigger = DateTrigger.__new__(DateTrigger)
+            trigger.__setstate__({'version': 1, 'run_date': start_date})
+        job = Job.__new__(Job)
+        job.__setstate__({
+            'version': 1,
+            'id': job_id,
+            'func': REMINDER_FUNC_REF,
+            'trigger': trigger,
+            'executor': 'default',
+            'args': (reminder_id,),
+            'kwargs': {},
+            'name': 'send_private_zulip_reminder',
+            'next_run_time': datetime.fromtimestamp(next_run_time, timezone) if next_run_time is not None else None,
+            **self._scheduler._job_defaults,
+        })
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
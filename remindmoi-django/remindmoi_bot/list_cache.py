@@ -0,0 +1,66 @@
+import uuid
+
+from typing import Callable, Dict
+
+from django.core.cache import cache
+
+from remindmoi.settings import LIST_CACHE_TIMEOUT_SECONDS
+
+LIST_CACHE_PREFIX = 'list_reminders'
+
+
+def get_cached_list(zulip_user_email: str, render: Callable[[], bytes]) -> bytes:
+    """
+    Return the cached `list` response of a user, rendering it on a miss.
+
+    The version is read before rendering, so a response rendered while a
+    mutation invalidates it is stored under a version nobody asks for anymore.
+    """
+    key = f"{LIST_CACHE_PREFIX}:{zulip_user_email.lower()}:{_get_version(zulip_user_email)}"
+    content = cache.get(key)
+    if content is not None:
+        _count('hits')
+        return content
+    _count('misses')
+    content = render()
+    cache.set(key, content, LIST_CACHE_TIMEOUT_SECONDS)
+    return content
+
+
+def invalidate_lists(zulip_user_email: str) -> None:
+    """
+    Invalidate the `list` responses of every user of a reminder.
+    zulip_user_email is the reminder field, comma separated for multi_remind.
+    """
+    for email in zulip_user_email.split(','):
+        # Fresh random versions are never reused, even if a version key gets evicted
+        cache.set(_version_key(email), uuid.uuid4().hex, None)
+
+
+def get_list_cache_stats() -> Dict[str, float]:
+    hits = cache.get(f"{LIST_CACHE_PREFIX}:hits", 0)
+    misses = cache.get(f"{LIST_CACHE_PREFIX}:misses", 0)
+    lookups = hits + misses
+    return {'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0}
+
+
+def _version_key(zulip_user_email: str) -> str:
+    return f"{LIST_CACHE_PREFIX}:version:{zulip_user_email.lower()}"
+
+
+def _get_version(zulip_user_email: str) -> str:
+    key = _version_key(zulip_user_email)
+    cache.add(key, uuid.uuid4().hex, None)
+    # Falls back to an unused version (a miss) if the key got evicted meanwhile
+    return cache.get(key) or uuid.uuid4().hex
+
+
+def _count(metric: str) -> None:
+    key = f"{LIST_CACHE_PREFIX}:{metric}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:  # Evicted between add and incr
+        pass
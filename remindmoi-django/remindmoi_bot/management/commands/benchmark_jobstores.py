@@ -0,0 +1,74 @@
+import time
+
+from datetime import datetime, timedelta
+
+import pytz
+
+from apscheduler.job import Job
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.models import DjangoJob
+
+from remindmoi_bot.jobstores import ReminderJobStore, REMINDER_FUNC_REF
+from remindmoi_bot.models import ReminderJob
+
+
+class Command(BaseCommand):
+    help = "Compare storage size and load time of the pickle and the reminder job stores."
+    # The checks import the views, which would start the web scheduler
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=1000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Nothing is kept, the benchmark rows are rolled back at the end
+        with transaction.atomic():
+            self.benchmark('pickle', DjangoJobStore(), DjangoJob, options)
+            self.benchmark('reminder', ReminderJobStore(), ReminderJob, options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, name, jobstore, model, options):
+        scheduler = BackgroundScheduler(timezone=pytz.utc)
+        jobstore.start(scheduler, 'default')
+        now = datetime.now(pytz.utc)
+        for reminder_id in range(options['jobs']):
+            if reminder_id % 2:
+                trigger = IntervalTrigger(days=1, start_date=now + timedelta(days=1), timezone=pytz.utc)
+            else:
+                trigger = DateTrigger(run_date=now + timedelta(hours=reminder_id), timezone=pytz.utc)
+            jobstore.add_job(Job(scheduler,
+                                 id=f"{reminder_id}benchmark reminder title",
+                                 func=REMINDER_FUNC_REF,
+                                 trigger=trigger,
+                                 executor='default',
+                                 args=(reminder_id,),
+                                 kwargs={},
+                                 name='send_private_zulip_reminder',
+                                 next_run_time=trigger.get_next_fire_time(None, now),
+                                 **scheduler._job_defaults))
+
+        # Approximate row size: bytes of every column value as stored
+        row_size = sum(len(value) if isinstance(value, bytes) else len(str(value))
+                       for row in model.objects.values_list()
+                       for value in row) / options['jobs']
+
+        start = time.perf_counter()
+        for _ in range(options['rounds']):
+            jobstore.get_all_jobs()
+        load_time = (time.perf_counter() - start) / options['rounds']
+
+        job_ids = [job.id for job in jobstore.get_all_jobs()]
+        start = time.perf_counter()
+        for job_id in job_ids:
+            jobstore.lookup_job(job_id)
+        lookup_time = (time.perf_counter() - start) / len(job_ids)
+
+        self.stdout.write(f"{name}: {row_size:.0f} bytes/job, "
+                          f"load {options['jobs']} jobs in {load_time * 1000:.1f} ms, "
+                          f"lookup in {lookup_time * 1e6:.0f} us")
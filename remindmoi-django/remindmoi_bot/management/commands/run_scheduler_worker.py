@@ -0,0 +1,59 @@
+import os
+import signal
+import socket
+import sys
+import time
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from remindmoi.settings import SCHEDULER_SHARDED, SCHEDULER_HEARTBEAT_SECONDS
+from remindmoi_bot.sharding import ShardedReminderJobStore, create_worker_scheduler
+
+
+class Command(BaseCommand):
+    help = "Run a scheduler worker that fires its shard of the reminders."
+    # The checks import the views, which would start the web scheduler in the worker
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}")
+        parser.add_argument('--threads', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if not SCHEDULER_SHARDED:
+            raise CommandError("Set REMINDMOI_SCHEDULER_SHARDED=1, for the workers and the web process, "
+                               "otherwise the web process fires reminders too.")
+
+        jobstore = ShardedReminderJobStore(options['worker_id'])
+        scheduler = create_worker_scheduler(jobstore, ThreadPoolExecutor(options['threads']))
+
+        # supervisord stops programs with SIGTERM, leave the shard like on ^C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        self.heartbeat(jobstore)  # Join before the first lookup for due jobs
+        scheduler.start()
+        self.stdout.write(f"Scheduler worker {jobstore.worker_id} started!")
+
+        try:
+            # Heartbeats also wake the scheduler up, so jobs added by the web
+            # process and shards taken over from dead workers get picked up
+            while True:
+                time.sleep(SCHEDULER_HEARTBEAT_SECONDS)
+                self.heartbeat(jobstore)
+                scheduler.wakeup()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            scheduler.shutdown()
+            try:
+                jobstore.leave()  # Hand the shard over without waiting for the timeout
+            except DatabaseError:
+                pass  # The other workers expire it after SCHEDULER_WORKER_TIMEOUT_SECONDS
+
+    def heartbeat(self, jobstore: ShardedReminderJobStore) -> None:
+        try:
+            jobstore.heartbeat()
+        except DatabaseError as e:  # e.g. "database is locked" on SQLite, retry on the next tick
+            self.stderr.write(f"Heartbeat of worker {jobstore.worker_id} failed: {e}")
@@ -0,0 +1,32 @@
+# Generated by Django 2.2 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('remindmoi_bot', '0003_auto_20200113_2239'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerWorker',
+            fields=[
+                ('worker_id', models.CharField(max_length=128, primary_key=True, serialize=False)),
+                ('last_heartbeat', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FiredOccurrence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reminder_id', models.IntegerField()),
+                ('run_time', models.DateTimeField()),
+                ('worker_id', models.CharField(max_length=128)),
+            ],
+            options={
+                'unique_together': {('reminder_id', 'run_time')},
+            },
+        ),
+    ]
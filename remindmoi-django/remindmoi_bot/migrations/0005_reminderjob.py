@@ -0,0 +1,66 @@
+# Generated by Django 2.2 on 2026-10-19 14:03
+
+import pickle
+
+from django.db import migrations, models
+
+REMINDER_FUNC_REF = 'remindmoi_bot.zulip_utils:send_private_zulip_reminder'
+
+
+def convert_pickled_jobs(apps, schema_editor):
+    """
+    Move the reminder jobs pickled by django_apscheduler's DjangoJobStore
+    into ReminderJob rows. Nothing reads the old table afterwards, so jobs
+    that can't be converted fail the migration instead of being left behind.
+    """
+    DjangoJob = apps.get_model('django_apscheduler', 'DjangoJob')
+    ReminderJob = apps.get_model('remindmoi_bot', 'ReminderJob')
+    django_jobs = [(django_job, pickle.loads(django_job.job_state)) for django_job in DjangoJob.objects.all()]
+
+    unsupported_jobs = [job_state['id'] for _, job_state in django_jobs
+                        if job_state['func'] != REMINDER_FUNC_REF
+                        or type(job_state['trigger']).__name__ not in ('DateTrigger', 'IntervalTrigger')]
+    if unsupported_jobs:
+        raise ValueError(f"Can't convert scheduler jobs {unsupported_jobs}: only {REMINDER_FUNC_REF} jobs "
+                         f"with date or interval triggers are supported. Remove them from "
+                         f"{DjangoJob._meta.db_table} and migrate again.")
+
+    for django_job, job_state in django_jobs:
+        trigger = job_state['trigger']
+        if type(trigger).__name__ == 'DateTrigger':
+            fields = {'trigger_type': 'date',
+                      'start_date': trigger.run_date.timestamp(),
+                      'interval': None}
+        else:
+            fields = {'trigger_type': 'interval',
+                      'start_date': trigger.start_date.timestamp(),
+                      'interval': trigger.interval.total_seconds()}
+        next_run_time = job_state['next_run_time']
+        ReminderJob.objects.create(job_id=job_state['id'],
+                                   reminder_id=job_state['args'][0],
+                                   next_run_time=next_run_time.timestamp() if next_run_time else None,
+                                   **fields)
+        django_job.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_apscheduler', '0002_auto_20180412_0758'),
+        ('remindmoi_bot', '0004_schedulerworker_firedoccurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderJob',
+            fields=[
+                ('job_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('reminder_id', models.IntegerField(db_index=True)),
+                ('trigger_type', models.CharField(choices=[('date', 'date'), ('interval', 'interval')], max_length=8)),
+                ('start_date', models.FloatField()),
+                ('interval', models.FloatField(null=True)),
+                ('next_run_time', models.FloatField(db_index=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(convert_pickled_jobs, migrations.RunPython.noop),
+    ]
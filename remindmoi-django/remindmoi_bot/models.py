@@ -9,3 +9,46 @@ class Reminder(models.Model):
     created = models.DateTimeField()
     deadline = models.DateTimeField()
     active = models.BooleanField(default=True)
+
+
+class SchedulerWorker(models.Model):
+    """
+    A running `run_scheduler_worker` process. Rows older than
+    SCHEDULER_WORKER_TIMEOUT are considered dead and get rebalanced away.
+    """
+    worker_id = models.CharField(max_length=128, primary_key=True)
+
+    last_heartbeat = models.DateTimeField()
+
+
+class FiredOccurrence(models.Model):
+    """
+    Claim taken by a worker right before it fires one occurrence of a reminder.
+    The unique constraint guarantees an occurrence is fired at most once.
+    """
+    reminder_id = models.IntegerField()
+    run_time = models.DateTimeField()
+    worker_id = models.CharField(max_length=128)
+
+    class Meta:
+        unique_together = ('reminder_id', 'run_time')
+
+
+class ReminderJob(models.Model):
+    """
+    Scheduler job of a reminder, see remindmoi_bot.jobstores.ReminderJobStore.
+    start_date is the run date of date triggers and the first run of interval ones.
+    Times are UTC epoch seconds and the interval is in seconds, which loads much
+    faster than datetime and duration columns.
+    """
+    DATE = 'date'
+    INTERVAL = 'interval'
+    TRIGGER_TYPES = [(DATE, 'date'), (INTERVAL, 'interval')]
+
+    job_id = models.CharField(max_length=255, primary_key=True)
+
+    reminder_id = models.IntegerField(db_index=True)
+    trigger_type = models.CharField(max_length=8, choices=TRIGGER_TYPES)
+    start_date = models.FloatField()
+    interval = models.FloatField(null=True)
+    next_run_time = models.FloatField(null=True, db_index=True)
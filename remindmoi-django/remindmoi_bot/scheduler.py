@@ -1,9 +1,12 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-from django_apscheduler.jobstores import DjangoJobStore
+
+from remindmoi.settings import SCHEDULER_SHARDED
+from remindmoi_bot.jobstores import ReminderJobStore
 
 
 scheduler = BackgroundScheduler()
-scheduler.add_jobstore(DjangoJobStore(), "default")
+scheduler.add_jobstore(ReminderJobStore(), "default")
 
-scheduler.start()
+# Sharded workers do the firing, this process only writes jobs to the store
+scheduler.start(paused=SCHEDULER_SHARDED)
 print("Scheduler started!")
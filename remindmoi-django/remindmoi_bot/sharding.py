@@ -0,0 +1,158 @@
+import hashlib
+
+from datetime import datetime, timedelta
+from typing import List
+
+from apscheduler.executors.base import BaseExecutor
+from apscheduler.job import Job
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.util import datetime_to_utc_timestamp
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from remindmoi.settings import (SCHEDULER_WORKER_TIMEOUT_SECONDS,
+                                SCHEDULER_CLAIM_RETENTION_DAYS)
+from remindmoi_bot.jobstores import ReminderJobStore
+from remindmoi_bot.models import SchedulerWorker, FiredOccurrence, ReminderJob
+
+
+def shard_owner(reminder_id: int, worker_ids: List[str]) -> str:
+    """
+    Rendezvous hashing: every worker scores the reminder and the highest
+    score owns it. Only the reminders of a leaving/joining worker move.
+    """
+    def score(worker_id: str) -> int:
+        digest = hashlib.blake2b(f"{worker_id}:{reminder_id}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    return max(worker_ids, key=score)
+
+
+class ShardedReminderJobStore(ReminderJobStore):
+    """
+    ReminderJobStore that only hands the scheduler the jobs of its own shard.
+
+    Ownership is recomputed on every heartbeat from the live workers table.
+    Workers can briefly disagree while rebalancing, so every occurrence is
+    claimed in FiredOccurrence before it runs.
+    """
+
+    def __init__(self, worker_id: str, **kwargs):
+        super().__init__(**kwargs)
+        self.worker_id = worker_id
+        self.live_workers = []
+
+    def start(self, scheduler, alias):
+        if scheduler._job_defaults['misfire_grace_time'] is not None:
+            raise ValueError(f"{self.__class__.__name__} needs misfire_grace_time=None, "
+                             f"claimed occurrences would be dropped as misfires")
+        super().start(scheduler, alias)
+
+    def heartbeat(self) -> None:
+        now = timezone.now()
+        SchedulerWorker.objects.update_or_create(worker_id=self.worker_id,
+                                                 defaults={'last_heartbeat': now})
+        SchedulerWorker.objects.filter(
+            last_heartbeat__lt=now - timedelta(seconds=SCHEDULER_WORKER_TIMEOUT_SECONDS)
+        ).delete()
+        FiredOccurrence.objects.filter(
+            run_time__lt=now - timedelta(days=SCHEDULER_CLAIM_RETENTION_DAYS)
+        ).delete()
+        self.live_workers = sorted(SchedulerWorker.objects.values_list('worker_id', flat=True))
+
+    def leave(self) -> None:
+        SchedulerWorker.objects.filter(worker_id=self.worker_id).delete()
+        self.live_workers = []
+
+    def owns(self, reminder_id: int) -> bool:
+        if not self.live_workers:
+            return False
+        return shard_owner(reminder_id, self.live_workers) == self.worker_id
+
+    def get_due_jobs(self, now) -> List[Job]:
+        due_jobs = []
+        # Rows of other shards are dropped before paying for their Job objects
+        for row in self._get_rows(next_run_time__lte=datetime_to_utc_timestamp(now)):
+            job_id, reminder_id = row[:2]
+            # A job at max_instances would be claimed and then skipped by the
+            # scheduler, leave it due until the running instance is done
+            if not self.owns(reminder_id) or self._is_running(job_id):
+                continue
+            job = self._reconstitute_job(*row)
+            try:
+                if self._claim(job):
+                    due_jobs.append(job)
+                else:  # Fired by a previous owner, only move the job forward
+                    self._skip_fired_occurrence(job, now)
+            except DatabaseError as e:
+                # Return the jobs claimed so far, this one is retried on the next wakeup
+                self._logger.warning("Claiming job %s failed: %s", job.id, e)
+        return due_jobs
+
+    def get_next_run_time(self):
+        try:
+            # Stop at the first owned job, about one in len(live_workers) rows
+            next_run_times = ReminderJob.objects.filter(next_run_time__isnull=False).order_by(
+                'next_run_time').values_list('job_id', 'reminder_id', 'next_run_time').iterator()
+            next_run_time = next((next_run_time
+                                  for job_id, reminder_id, next_run_time in next_run_times
+                                  if self.owns(reminder_id) and not self._is_running(job_id)),
+                                 None)
+        except DatabaseError as e:
+            # Raising would stop the scheduler thread, the next heartbeat wakes it up
+            self._logger.warning("Getting the next run time failed: %s", e)
+            return None
+        return datetime.fromtimestamp(next_run_time, self._scheduler.timezone) if next_run_time is not None else None
+
+    def update_job(self, job: Job) -> None:
+        try:
+            super().update_job(job)
+        except JobLookupError:  # Already removed by the worker that fired it
+            pass
+        except DatabaseError as e:
+            # The occurrence is claimed, the next lookup skips it and retries this
+            self._logger.warning("Updating job %s failed: %s", job.id, e)
+
+    def remove_job(self, job_id: str) -> None:
+        try:
+            super().remove_job(job_id)
+        except JobLookupError:
+            pass
+        except DatabaseError as e:
+            self._logger.warning("Removing job %s failed: %s", job_id, e)
+
+    def _is_running(self, job_id: str) -> bool:
+        # Jobs of this store always use the default executor and max_instances
+        executor = self._scheduler._lookup_executor('default')
+        return executor._instances.get(job_id, 0) >= self._scheduler._job_defaults['max_instances']
+
+    def _claim(self, job: Job) -> bool:
+        try:
+            with transaction.atomic():
+                FiredOccurrence.objects.create(reminder_id=job.args[0],
+                                               run_time=job.next_run_time,
+                                               worker_id=self.worker_id)
+            return True
+        except IntegrityError:
+            return False
+
+    def _skip_fired_occurrence(self, job: Job, now) -> None:
+        run_times = job._get_run_times(now)
+        next_run_time = job.trigger.get_next_fire_time(run_times[-1], now) if run_times else None
+        if next_run_time:
+            job._modify(next_run_time=next_run_time)
+            self.update_job(job)
+        else:
+            self.remove_job(job.id)
+
+
+def create_worker_scheduler(jobstore: ShardedReminderJobStore, executor: BaseExecutor) -> BackgroundScheduler:
+    """
+    Workers only notice new jobs and jobs of dead workers on a heartbeat, which
+    can be well past their run time, so claimed occurrences must never misfire.
+    """
+    scheduler = BackgroundScheduler(executors={'default': executor},
+                                    job_defaults={'misfire_grace_time': None})
+    scheduler.add_jobstore(jobstore, "default")
+    return scheduler
@@ -1,3 +1,413 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytz
+
+from apscheduler.executors.base import run_job
+from apscheduler.executors.debug import DebugExecutor
+from apscheduler.job import Job
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.models import DjangoJob
+
+from remindmoi_bot.jobstores import ReminderJobStore, REMINDER_FUNC_REF
+from remindmoi_bot.list_cache import get_cached_list, get_list_cache_stats, invalidate_lists
+from remindmoi_bot.models import Reminder, ReminderJob, SchedulerWorker, FiredOccurrence
+from remindmoi_bot.sharding import ShardedReminderJobStore, create_worker_scheduler, shard_owner
+from remindmoi_bot.zulip_utils import send_private_zulip_reminder
+
+
+@mock.patch('remindmoi_bot.views.scheduler')
+class ListCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.reminder = self.create_reminder('jose@monadical.com', 'clean the dishes')
+
+    def create_reminder(self, zulip_user_email, title):
+        now = datetime.now(pytz.utc)
+        return Reminder.objects.create(zulip_user_email=zulip_user_email,
+                                       title=title,
+                                       created=now,
+                                       deadline=now + timedelta(days=1))
+
+    def post(self, endpoint, data):
+        return self.client.post(endpoint, json.dumps(data), content_type='application/json').json()
+
+    def list_titles(self, zulip_user_email='jose@monadical.com'):
+        response = self.post('/list_reminders', {'zulip_user_email': zulip_user_email})
+        return [reminder['title'] for reminder in response['reminders_list']]
+
+    def test_list_is_served_from_cache(self, scheduler):
+        self.assertEqual(self.list_titles(), ['clean the dishes'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.list_titles(), ['clean the dishes'])
+        self.assertEqual(self.client.get('/list_cache_stats').json(),
+                         {'success': True, 'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_add_reminder_invalidates_list(self, scheduler):
+        self.list_titles()
+        now = datetime.now(pytz.utc).timestamp()
+        self.post('/add_reminder', {'zulip_user_email': 'jose@monadical.com',
+                                    'title': 'eat',
+                                    'created': now,
+                                    'deadline': now + 3600})
+        self.assertEqual(sorted(self.list_titles()), ['clean the dishes', 'eat'])
+
+    def test_remove_reminder_invalidates_list(self, scheduler):
+        self.list_titles()
+        self.post('/remove_reminder', {'reminder_id': self.reminder.reminder_id})
+        self.assertEqual(self.list_titles(), [])
+
+    def test_repeat_reminder_invalidates_list(self, scheduler):
+        self.list_titles()
+        self.post('/repeat_reminder', {'reminder_id': self.reminder.reminder_id,
+                                       'repeat_unit': 'days',
+                                       'repeat_value': 1})
+        self.assertEqual(get_list_cache_stats()['hits'], 0)
+        self.list_titles()
+        self.assertEqual(get_list_cache_stats()['misses'], 2)
+
+    @mock.patch('remindmoi_bot.views.get_user_emails', return_value=['max@monadical.com'])
+    def test_multi_remind_invalidates_lists_of_every_recipient(self, get_user_emails, scheduler):
+        self.assertEqual(self.list_titles('max@monadical.com'), [])
+        self.list_titles()
+        self.post('/multi_remind', {'reminder_id': self.reminder.reminder_id,
+                                    'users_to_remind': ['Max']})
+        self.assertEqual(self.list_titles('max@monadical.com'), ['clean the dishes'])
+        self.assertEqual(self.list_titles(), ['clean the dishes'])
+        self.assertEqual(get_list_cache_stats()['hits'], 0)
+
+    @mock.patch('remindmoi_bot.zulip_utils.client')
+    def test_firing_invalidates_list(self, client, scheduler):
+        client.send_message.return_value = {'result': 'success'}
+        self.list_titles()
+        send_private_zulip_reminder(self.reminder.reminder_id)
+        self.list_titles()
+        self.assertEqual(get_list_cache_stats()['hits'], 0)
+
+    def test_list_only_contains_exact_recipients(self, scheduler):
+        self.create_reminder('ajose@monadical.com', 'not mine')
+        self.assertEqual(self.list_titles(), ['clean the dishes'])
+
+    def test_list_rendered_during_a_mutation_is_never_served(self, scheduler):
+        def render_then_mutate():
+            content = b'stale'
+            invalidate_lists('jose@monadical.com')  # Mutation lands before the stale list is stored
+            return content
+
+        self.assertEqual(get_cached_list('jose@monadical.com', render_then_mutate), b'stale')
+        self.assertEqual(get_cached_list('jose@monadical.com', lambda: b'fresh'), b'fresh')
+
+
+class ShardingTests(TestCase):
+    """
+    Several workers sharing one database, driven by hand like their schedulers would.
+    """
+
+    def setUp(self):
+        self.now = datetime.now(pytz.utc).replace(microsecond=0)
+        self.fired = []
+
+    def create_jobstore(self, worker_id):
+        jobstore = ShardedReminderJobStore(worker_id)
+        jobstore.start(create_worker_scheduler(jobstore, DebugExecutor()), 'default')
+        return jobstore
+
+    def add_reminder_job(self, reminder_id, interval=None, run_time=None):
+        run_time = (run_time or self.now).timestamp()
+        ReminderJob.objects.create(job_id=f"{reminder_id}title",
+                                   reminder_id=reminder_id,
+                                   trigger_type=ReminderJob.INTERVAL if interval else ReminderJob.DATE,
+                                   start_date=run_time,
+                                   interval=interval.total_seconds() if interval else None,
+                                   next_run_time=run_time)
+
+    def fire(self, due_jobs, jobstore, now):
+        for job in due_jobs:  # Same steps as BaseScheduler._process_jobs
+            run_times = job._get_run_times(now)
+            self.fired.append((job.args[0], job.next_run_time))
+            next_run_time = job.trigger.get_next_fire_time(run_times[-1], now)
+            if next_run_time:
+                job._modify(next_run_time=next_run_time)
+                jobstore.update_job(job)
+            else:
+                jobstore.remove_job(job.id)
+
+    def test_shard_owner_spreads_reminders_evenly(self):
+        worker_ids = ['w1', 'w2', 'w3', 'w4']
+        owners = [shard_owner(reminder_id, worker_ids) for reminder_id in range(10000)]
+        for worker_id in worker_ids:
+            self.assertAlmostEqual(owners.count(worker_id) / len(owners), 0.25, delta=0.02)
+
+    def test_only_reminders_of_joining_or_leaving_worker_move(self):
+        before = {reminder_id: shard_owner(reminder_id, ['w1', 'w2', 'w3']) for reminder_id in range(1000)}
+        joined = {reminder_id: shard_owner(reminder_id, ['w1', 'w2', 'w3', 'w4']) for reminder_id in range(1000)}
+        left = {reminder_id: shard_owner(reminder_id, ['w1', 'w3']) for reminder_id in range(1000)}
+        for reminder_id, owner in before.items():
+            if joined[reminder_id] != owner:
+                self.assertEqual(joined[reminder_id], 'w4')
+            if owner != 'w2':
+                self.assertEqual(left[reminder_id], owner)
+
+    def test_heartbeat_expires_dead_workers(self):
+        SchedulerWorker.objects.create(worker_id='dead', last_heartbeat=timezone.now() - timedelta(minutes=5))
+        jobstore = self.create_jobstore('alive')
+        jobstore.heartbeat()
+        self.assertEqual(jobstore.live_workers, ['alive'])
+        self.assertFalse(SchedulerWorker.objects.filter(worker_id='dead').exists())
+
+    def test_get_next_run_time_only_considers_own_shard(self):
+        jobstores = [self.create_jobstore('w1'), self.create_jobstore('w2')]
+        for jobstore in jobstores:
+            jobstore.heartbeat()
+        jobstores[0].heartbeat()
+        for reminder_id in range(10):
+            self.add_reminder_job(reminder_id, run_time=self.now + timedelta(minutes=reminder_id))
+        for jobstore in jobstores:
+            first_owned = min(reminder_id for reminder_id in range(10) if jobstore.owns(reminder_id))
+            self.assertEqual(jobstore.get_next_run_time(), self.now + timedelta(minutes=first_owned))
+
+    def test_only_own_shard_is_loaded_as_jobs(self):
+        jobstores = [self.create_jobstore('w1'), self.create_jobstore('w2')]
+        for jobstore in jobstores:
+            jobstore.heartbeat()
+        jobstores[0].heartbeat()
+        for reminder_id in range(10):
+            self.add_reminder_job(reminder_id)
+        jobstore = jobstores[0]
+        owned = [reminder_id for reminder_id in range(10) if jobstore.owns(reminder_id)]
+        with mock.patch.object(jobstore, '_reconstitute_job', wraps=jobstore._reconstitute_job) as reconstitute:
+            due_jobs = jobstore.get_due_jobs(self.now)
+        self.assertEqual(sorted(job.args[0] for job in due_jobs), owned)
+        self.assertEqual(reconstitute.call_count, len(owned))
+
+    def test_occurrence_claimed_by_dead_worker_is_skipped(self):
+        self.add_reminder_job(1)
+        self.add_reminder_job(2, interval=timedelta(minutes=1))
+        for reminder_id in (1, 2):
+            FiredOccurrence.objects.create(reminder_id=reminder_id, run_time=self.now, worker_id='dead')
+        jobstore = self.create_jobstore('w1')
+        jobstore.heartbeat()
+
+        self.assertEqual(jobstore.get_due_jobs(self.now), [])
+        self.assertFalse(ReminderJob.objects.filter(reminder_id=1).exists())
+        self.assertEqual(ReminderJob.objects.get(reminder_id=2).next_run_time,
+                         (self.now + timedelta(minutes=1)).timestamp())
+
+    def test_each_occurrence_fires_once_across_rebalance(self):
+        for reminder_id in range(20):
+            self.add_reminder_job(reminder_id)
+            self.add_reminder_job(100 + reminder_id, interval=timedelta(minutes=1))
+        w1, w2 = self.create_jobstore('w1'), self.create_jobstore('w2')
+        w1.heartbeat()
+
+        # w2 joins, w1 doesn't know yet and still claims every reminder
+        w2.heartbeat()
+        now = self.now
+        w1_due, w2_due = w1.get_due_jobs(now), w2.get_due_jobs(now)
+        self.fire(w1_due, w1, now)
+        self.fire(w2_due, w2, now)
+
+        w1.heartbeat()
+        now += timedelta(minutes=1)
+        self.fire(w1.get_due_jobs(now), w1, now)
+        self.fire(w2.get_due_jobs(now), w2, now)
+
+        # w2 leaves, w1 takes its shard over
+        w2.leave()
+        w1.heartbeat()
+        now += timedelta(minutes=1)
+        self.fire(w1.get_due_jobs(now), w1, now)
+
+        expected = ([(reminder_id, self.now) for reminder_id in range(20)] +
+                    [(100 + reminder_id, self.now + timedelta(minutes=minutes))
+                     for reminder_id in range(20)
+                     for minutes in range(3)])
+        self.assertEqual(sorted(self.fired), sorted(expected))
+
+    @mock.patch('remindmoi_bot.zulip_utils.client')
+    def test_claimed_occurrence_is_executed_when_picked_up_late(self, client):
+        client.send_message.return_value = {'result': 'success'}
+        reminder = Reminder.objects.create(zulip_user_email='jose@monadical.com',
+                                           title='standup',
+                                           created=self.now - timedelta(hours=1),
+                                           deadline=self.now - timedelta(seconds=40))
+        self.add_reminder_job(reminder.reminder_id, run_time=reminder.deadline)
+        jobstore = self.create_jobstore('w1')
+        jobstore.heartbeat()
+
+        job, = jobstore.get_due_jobs(datetime.now(pytz.utc))
+        run_job(job, 'default', [job.next_run_time], __name__)
+        client.send_message.assert_called_once()
+
+    def test_claimed_jobs_are_returned_when_a_later_claim_fails(self):
+        self.add_reminder_job(1, run_time=self.now - timedelta(minutes=1))
+        self.add_reminder_job(2)
+        jobstore = self.create_jobstore('w1')
+        jobstore.heartbeat()
+
+        create = FiredOccurrence.objects.create
+        claims = []
+
+        def create_once(**kwargs):
+            if claims:
+                raise DatabaseError("database is locked")
+            claims.append(kwargs)
+            return create(**kwargs)
+
+        with mock.patch.object(FiredOccurrence.objects, 'create', side_effect=create_once):
+            due_jobs = jobstore.get_due_jobs(self.now)
+        self.assertEqual([job.args[0] for job in due_jobs], [1])
+        self.fire(due_jobs, jobstore, self.now)
+        self.fire(jobstore.get_due_jobs(self.now), jobstore, self.now)
+        self.assertEqual(self.fired, [(1, self.now - timedelta(minutes=1)), (2, self.now)])
+
+    def test_running_job_is_left_due_until_it_finishes(self):
+        self.add_reminder_job(1, interval=timedelta(minutes=1))
+        jobstore = self.create_jobstore('w1')
+        jobstore.heartbeat()
+        executor = jobstore._scheduler._lookup_executor('default')
+
+        executor._instances['1title'] = 1
+        self.assertEqual(jobstore.get_due_jobs(self.now), [])
+        self.assertIsNone(jobstore.get_next_run_time())
+        self.assertFalse(FiredOccurrence.objects.exists())
+
+        del executor._instances['1title']
+        self.fire(jobstore.get_due_jobs(self.now), jobstore, self.now)
+        self.assertEqual(self.fired, [(1, self.now)])
+
+    def test_jobstore_refuses_schedulers_dropping_misfires(self):
+        with self.assertRaises(ValueError):
+            ShardedReminderJobStore('w1').start(BackgroundScheduler(), 'default')
+
+
+def create_reminder_job(scheduler, job_id, trigger, func=REMINDER_FUNC_REF, **options):
+    now = datetime.now(pytz.utc)
+    return Job(scheduler,
+               id=job_id,
+               func=func,
+               trigger=trigger,
+               executor='default',
+               args=(int(job_id),),
+               kwargs={},
+               name='send_private_zulip_reminder',
+               next_run_time=trigger.get_next_fire_time(None, now),
+               **{**scheduler._job_defaults, **options})
+
+
+class ReminderJobStoreTests(TestCase):
+
+    def setUp(self):
+        self.scheduler = BackgroundScheduler(timezone=pytz.timezone('Europe/Paris'))
+        self.jobstore = ReminderJobStore()
+        self.jobstore.start(self.scheduler, 'default')
+        self.now = datetime.now(pytz.utc).replace(microsecond=0)
+
+    def test_date_job_round_trip(self):
+        run_date = self.now + timedelta(hours=1)
+        self.jobstore.add_job(create_reminder_job(self.scheduler, '1', DateTrigger(run_date, timezone=pytz.utc)))
+
+        job = self.jobstore.lookup_job('1')
+        self.assertEqual(job.func_ref, REMINDER_FUNC_REF)
+        self.assertEqual(job.args, (1,))
+        self.assertEqual(job.trigger.run_date, run_date)
+        self.assertEqual(job.next_run_time, run_date)
+        self.assertEqual(str(job.next_run_time.tzinfo), str(self.scheduler.timezone))
+        self.assertEqual(job.misfire_grace_time, self.scheduler._job_defaults['misfire_grace_time'])
+
+    def test_interval_job_round_trip(self):
+        trigger = IntervalTrigger(days=1, start_date=self.now - timedelta(hours=1), timezone=pytz.utc)
+        self.jobstore.add_job(create_reminder_job(self.scheduler, '2', trigger))
+
+        job = self.jobstore.lookup_job('2')
+        self.assertEqual(job.trigger.interval, timedelta(days=1))
+        self.assertEqual(job.trigger.start_date, self.now - timedelta(hours=1))
+        self.assertEqual(job.next_run_time, self.now + timedelta(hours=23))
+
+        job._modify(next_run_time=job.trigger.get_next_fire_time(job.next_run_time, self.now))
+        self.jobstore.update_job(job)
+        self.assertEqual(self.jobstore.lookup_job('2').next_run_time, self.now + timedelta(days=1, hours=23))
+
+    def test_get_due_jobs(self):
+        for job_id, hours in (('1', 2), ('2', -1), ('3', -2)):
+            trigger = DateTrigger(self.now + timedelta(hours=hours), timezone=pytz.utc)
+            self.jobstore.add_job(create_reminder_job(self.scheduler, job_id, trigger))
+        self.assertEqual([job.id for job in self.jobstore.get_due_jobs(self.now)], ['3', '2'])
+        self.assertEqual(self.jobstore.get_next_run_time(), self.now - timedelta(hours=2))
+
+    def test_conflicting_and_missing_jobs(self):
+        job = create_reminder_job(self.scheduler, '1', DateTrigger(self.now, timezone=pytz.utc))
+        self.jobstore.add_job(job)
+        with self.assertRaises(ConflictingIdError):
+            self.jobstore.add_job(job)
+        self.jobstore.remove_job('1')
+        self.assertIsNone(self.jobstore.lookup_job('1'))
+        with self.assertRaises(JobLookupError):
+            self.jobstore.update_job(job)
+        with self.assertRaises(JobLookupError):
+            self.jobstore.remove_job('1')
+
+    def test_unsupported_jobs_are_rejected(self):
+        trigger = DateTrigger(self.now, timezone=pytz.utc)
+        unsupported_jobs = [create_reminder_job(self.scheduler, '1', trigger, func='builtins:print'),
+                            create_reminder_job(self.scheduler, '2', CronTrigger(hour=9, timezone=pytz.utc)),
+                            create_reminder_job(self.scheduler, '3', trigger, misfire_grace_time=60)]
+        for job in unsupported_jobs:
+            with self.assertRaises(ValueError):
+                self.jobstore.add_job(job)
+        self.assertFalse(ReminderJob.objects.exists())
+
+
+class ConvertPickledJobsMigrationTests(TransactionTestCase):
+
+    def setUp(self):
+        self.migrate([('remindmoi_bot', '0004_schedulerworker_firedoccurrence')])
+        self.scheduler = BackgroundScheduler(timezone=pytz.utc)
+        self.now = datetime.now(pytz.utc).replace(microsecond=0)
+
+    def tearDown(self):
+        DjangoJob.objects.all().delete()
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+
+    def add_pickled_job(self, job):
+        DjangoJobStore().add_job(job)
+
+    def test_pickled_reminder_jobs_are_converted(self):
+        run_date = self.now + timedelta(hours=1)
+        self.add_pickled_job(create_reminder_job(self.scheduler, '1', DateTrigger(run_date)))
+        self.add_pickled_job(create_reminder_job(self.scheduler, '2', IntervalTrigger(weeks=2, start_date=run_date)))
+
+        self.migrate([('remindmoi_bot', '0005_reminderjob')])
+
+        self.assertFalse(DjangoJob.objects.exists())
+        self.assertEqual(list(ReminderJob.objects.order_by('job_id').values_list(
+                             'job_id', 'reminder_id', 'trigger_type', 'start_date', 'interval', 'next_run_time')),
+                         [('1', 1, ReminderJob.DATE, run_date.timestamp(), None, run_date.timestamp()),
+                          ('2', 2, ReminderJob.INTERVAL, run_date.timestamp(), timedelta(weeks=2).total_seconds(),
+                           run_date.timestamp())])
+
+    def test_unsupported_jobs_fail_the_migration(self):
+        self.add_pickled_job(create_reminder_job(self.scheduler, '1', DateTrigger(self.now)))
+        self.add_pickled_job(create_reminder_job(self.scheduler, '2', DateTrigger(self.now), func='builtins:print'))
+
+        with self.assertRaises(ValueError):
+            self.migrate([('remindmoi_bot', '0005_reminderjob')])
+        self.assertEqual(DjangoJob.objects.count(), 2)
@@ -6,10 +6,13 @@ from datetime import datetime
 from dateutil.tz import gettz
 from dateutil.parser import *
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 
+from remindmoi_bot.list_cache import (get_cached_list,
+                                      get_list_cache_stats,
+                                      invalidate_lists)
 from remindmoi_bot.models import Reminder
 from remindmoi_bot.scheduler import scheduler
 from remindmoi_bot.zulip_utils import (send_private_zulip_reminder,
@@ -29,6 +32,7 @@ def add_reminder(request):
                                deadline=datetime.utcfromtimestamp(reminder_obj['deadline']).replace(tzinfo=pytz.utc)
                                )
     reminder.save()
+    invalidate_lists(reminder.zulip_user_email)
     scheduler.add_job(  # Schedule reminder
         send_private_zulip_reminder,
         'date',
@@ -50,6 +54,7 @@ def isoadd_reminder(request):
                                deadline=datetime.utcfromtimestamp(reminder_obj['deadline']).replace(tzinfo=pytz.utc)
                                )
     reminder.save()
+    invalidate_lists(reminder.zulip_user_email)
     scheduler.add_job(  # Schedule reminder
         send_private_zulip_reminder,
         'date',
@@ -76,6 +81,7 @@ def multi_remind(request):
     user_emails_to_remind = get_user_emails(users_list) + [reminder.zulip_user_email]
     reminder.zulip_user_email = ','.join(user_emails_to_remind)
     reminder.save()
+    invalidate_lists(reminder.zulip_user_email)  # New list includes the previous emails
     return JsonResponse({'success': True})
 
 
@@ -86,23 +92,37 @@ def remove_reminder(request):
     reminder = Reminder.objects.get(reminder_id=int(reminder_id))
     scheduler.remove_job((str(reminder.reminder_id)+reminder.title))  # Remove reminder job
     reminder.delete()  # Remove reminder object
+    invalidate_lists(reminder.zulip_user_email)
     return JsonResponse({'success': True})
 
 
 @csrf_exempt
 @require_POST
 def list_reminders(request):
+    zulip_user_email = json.loads(request.body)['zulip_user_email']
+    content = get_cached_list(zulip_user_email, lambda: render_reminders_list(zulip_user_email))
+    return HttpResponse(content, content_type='application/json')
+
+
+def render_reminders_list(zulip_user_email: str) -> bytes:
     response_reminders = []  # List of reminders to be returned to the client
 
-    zulip_user_email = json.loads(request.body)['zulip_user_email']
     user_reminders = Reminder.objects.filter(zulip_user_email__icontains=zulip_user_email)
     # Return title and deadline (in unix timestamp) of reminders
     for reminder in user_reminders.values():
+        # Only exact recipients, so invalidating their lists is enough
+        if zulip_user_email.lower() not in reminder['zulip_user_email'].lower().split(','):
+            continue
         response_reminders.append({'title': reminder['title'],
                                    'deadline': reminder['deadline'].timestamp(),
                                    'reminder_id': reminder['reminder_id']})
 
-    return JsonResponse({'success': True, 'reminders_list': response_reminders})
+    return JsonResponse({'success': True, 'reminders_list': response_reminders}).content
+
+
+@require_GET
+def list_cache_stats(request):
+    return JsonResponse({'success': True, **get_list_cache_stats()})
 
 
 @csrf_exempt
@@ -122,4 +142,5 @@ def repeat_reminder(request):
                       args=[reminder.reminder_id],
                       id=job_id
         )
+    invalidate_lists(reminder.zulip_user_email)
     return JsonResponse({'success': True})
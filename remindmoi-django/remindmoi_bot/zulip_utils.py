@@ -3,6 +3,7 @@ import zulip
 from typing import Dict, List
 
 from remindmoi.settings import ZULIPRC
+from remindmoi_bot.list_cache import invalidate_lists
 from remindmoi_bot.models import Reminder
 
 SINGULAR_UNITS = ['minute', 'hour', 'day', 'week', 'month']
@@ -22,6 +23,7 @@ def send_private_zulip_reminder(reminder_id: int) -> bool:
             "content": content
         })
     reminder.active = False  # For now, set reminder to negative to denoate that it's done
+    invalidate_lists(reminder.zulip_user_email)
     return response['result'] == 'success'
 
 